@@ -17,6 +17,15 @@ RP_API = "2021-04-01"
 ALERTS_API = "2023-01-01-preview"
 RP_LOCATION_API = "2022-01-01"
 
+AZURE_MONITOR_METRICS_RPS = frozenset({
+    "microsoft.insights",
+    "microsoft.alertsmanagement",
+    "microsoft.monitor",
+    "microsoft.dashboard",
+})
+RP_REGISTRATION_CACHE_FILE = "aks_rp_registration_cache.json"
+RP_REGISTRATION_CACHE_TTL_SECONDS = 24 * 60 * 60
+
 
 MapToClosestMACRegion = {
     "australiacentral": "eastus",
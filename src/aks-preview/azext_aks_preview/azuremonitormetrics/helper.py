@@ -3,30 +3,54 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from knack.log import get_logger
 from knack.util import CLIError
 from azure.cli.core.azclierror import (
     UnknownError
 )
 from azext_aks_preview.azuremonitormetrics.constants import (
     RP_API,
-    AKS_CLUSTER_API
+    AKS_CLUSTER_API,
+    AZURE_MONITOR_METRICS_RPS,
+    RP_REGISTRATION_CACHE_FILE,
+    RP_REGISTRATION_CACHE_TTL_SECONDS
+)
+
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+logger = get_logger(__name__)
+
+_RP_URL = "{armendpoint}/subscriptions/{subscription_id}/providers/{rp_name}?api-version=" + RP_API
+_RP_REGISTER_URL = (
+    "{armendpoint}/subscriptions/{subscription_id}/providers/{rp_name}/register?api-version=" + RP_API
+)
+_AKS_CLUSTER_URL = (
+    "{armendpoint}/subscriptions/{subscription_id}/resourceGroups/{resource_group_name}/providers/"
+    "Microsoft.ContainerService/managedClusters/{cluster_name}?api-version=" + AKS_CLUSTER_API
 )
 
 
 def sanitize_resource_id(resource_id):
-    resource_id = resource_id.strip()
+    resource_id = resource_id.strip().lower()
     if not resource_id.startswith("/"):
         resource_id = "/" + resource_id
-    if resource_id.endswith("/"):
-        resource_id = resource_id.rstrip("/")
-    return resource_id.lower()
+    return resource_id.rstrip("/")
 
 
 def post_request(cmd, subscription_id, rp_name, headers):
     from azure.cli.core.util import send_raw_request
     armendpoint = cmd.cli_ctx.cloud.endpoints.resource_manager
-    customUrl = (
-        f"{armendpoint}/subscriptions/{subscription_id}/providers/{rp_name}/register?api-version={RP_API}"
+    customUrl = _RP_REGISTER_URL.format(
+        armendpoint=armendpoint,
+        subscription_id=subscription_id,
+        rp_name=rp_name
     )
     try:
         send_raw_request(cmd.cli_ctx, "POST", customUrl, headers=headers)
@@ -34,80 +58,127 @@ def post_request(cmd, subscription_id, rp_name, headers):
         raise CLIError(e)  # pylint: disable=raise-missing-from
 
 
-def rp_registrations(cmd, subscription_id):
+def get_rp_registration(cmd, subscription_id, rp_name):
     from azure.cli.core.util import send_raw_request
-    # Get list of RP's for RP's subscription
+    # Get a single RP for the subscription
     try:
-        headers = ['User-Agent=azuremonitormetrics.get_mac_sub_list']
+        headers = ['User-Agent=azuremonitormetrics.get_rp_registration_state']
         armendpoint = cmd.cli_ctx.cloud.endpoints.resource_manager
-        customUrl = (
-            f"{armendpoint}/subscriptions/{subscription_id}/providers?"
-            f"api-version={RP_API}&$select=namespace,registrationstate"
+        customUrl = _RP_URL.format(
+            armendpoint=armendpoint,
+            subscription_id=subscription_id,
+            rp_name=rp_name
         )
         r = send_raw_request(cmd.cli_ctx, "GET", customUrl, headers=headers)
     except CLIError as e:
         raise CLIError(e)  # pylint: disable=raise-missing-from
-    isInsightsRpRegistered = False
-    isAlertsManagementRpRegistered = False
-    isMoniotrRpRegistered = False
-    isDashboardRpRegistered = False
-    json_response = json.loads(r.text)
-    values_array = json_response["value"]
-    for value in values_array:
-        if (
-            value["namespace"].lower() == "microsoft.insights" and
-            value["registrationState"].lower() == "registered"
-        ):
-            isInsightsRpRegistered = True
-        if (
-            value["namespace"].lower() == "microsoft.alertsmanagement" and
-            value["registrationState"].lower() == "registered"
-        ):
-            isAlertsManagementRpRegistered = True
-        if (
-            value["namespace"].lower() == "microsoft.monitor" and
-            value["registrationState"].lower() == "registered"
-        ):
-            isAlertsManagementRpRegistered = True
-        if (
-            value["namespace"].lower() == "microsoft.dashboard" and
-            value["registrationState"].lower() == "registered"
-        ):
-            isAlertsManagementRpRegistered = True
-    if not isInsightsRpRegistered:
-        headers = ['User-Agent=azuremonitormetrics.register_insights_rp']
-        post_request(cmd, subscription_id, "microsoft.insights", headers)
-    if isAlertsManagementRpRegistered is False:
-        headers = ['User-Agent=azuremonitormetrics.register_alertsmanagement_rp']
-        post_request(cmd, subscription_id, "microsoft.alertsmanagement", headers)
-    if isMoniotrRpRegistered is False:
-        headers = ['User-Agent=azuremonitormetrics.register_monitor_rp']
-        post_request(cmd, subscription_id, "microsoft.monitor", headers)
-    if isDashboardRpRegistered is False:
-        headers = ['User-Agent=azuremonitormetrics.register_dashboard_rp']
-        post_request(cmd, subscription_id, "microsoft.dashboard", headers)
+    return _loads(r.content)
+
+
+def _get_rp_registration_cache_path():
+    from azure.cli.core.api import get_config_dir
+    return os.path.join(get_config_dir(), RP_REGISTRATION_CACHE_FILE)
+
+
+def _load_rp_registration_cache():
+    try:
+        with open(_get_rp_registration_cache_path(), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def is_rp_registration_cached(subscription_id):
+    entry = _load_rp_registration_cache().get(subscription_id)
+    if not isinstance(entry, dict):
+        return False
+    timestamp = entry.get("timestamp")
+    registered_namespaces = entry.get("registered_namespaces")
+    # Anything that does not look like an entry we wrote is treated as a cache miss
+    if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)):
+        return False
+    if not isinstance(registered_namespaces, list) or not all(isinstance(ns, str) for ns in registered_namespaces):
+        return False
+    if not 0 <= time.time() - timestamp <= RP_REGISTRATION_CACHE_TTL_SECONDS:
+        return False
+    return AZURE_MONITOR_METRICS_RPS.issubset(registered_namespaces)
+
+
+def cache_rp_registration(subscription_id, registered_rp_names):
+    cache_path = _get_rp_registration_cache_path()
+    cache = _load_rp_registration_cache()
+    cache[subscription_id] = {
+        "timestamp": time.time(),
+        "registered_namespaces": sorted(registered_rp_names),
+    }
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+        # Atomic replace so concurrent CLI invocations never observe a partially written cache
+        os.replace(tmp_path, cache_path)
+    except (OSError, ValueError) as e:
+        logger.debug("Failed to write the RP registration cache: %s", e)
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+def rp_registrations(cmd, subscription_id):
+    # RP registration is a one-time operation per subscription, skip the probes if it was seen recently
+    if is_rp_registration_cached(subscription_id):
+        return
+    # Probe only the RP's we need instead of listing every RP in the subscription
+    with ThreadPoolExecutor(max_workers=len(AZURE_MONITOR_METRICS_RPS)) as executor:
+        providers = executor.map(
+            lambda rp_name: get_rp_registration(cmd, subscription_id, rp_name),
+            AZURE_MONITOR_METRICS_RPS
+        )
+        # Key by the requested (already lowercase) namespace rather than normalizing the response casing
+        registered_rp_names = {
+            rp_name
+            for rp_name, provider in zip(AZURE_MONITOR_METRICS_RPS, providers)
+            if provider["registrationState"].lower() == "registered"
+        }
+    missing_rp_names = AZURE_MONITOR_METRICS_RPS - registered_rp_names
+    if not missing_rp_names:
+        cache_rp_registration(subscription_id, registered_rp_names)
+        return
+    # The register calls are independent of each other, so issue them concurrently
+    with ThreadPoolExecutor(max_workers=len(missing_rp_names)) as executor:
+        list(executor.map(
+            lambda rp_name: post_request(
+                cmd,
+                subscription_id,
+                rp_name,
+                [f"User-Agent=azuremonitormetrics.register_{rp_name.split('.')[-1]}_rp"]
+            ),
+            missing_rp_names
+        ))
 
 
 def check_azuremonitormetrics_profile(cmd, cluster_subscription, cluster_resource_group_name, cluster_name):
     from azure.cli.core.util import send_raw_request
     armendpoint = cmd.cli_ctx.cloud.endpoints.resource_manager
-    feature_check_url = (
-        f"{armendpoint}/subscriptions/{cluster_subscription}/resourceGroups/{cluster_resource_group_name}/providers/"
-        f"Microsoft.ContainerService/managedClusters/{cluster_name}?api-version={AKS_CLUSTER_API}"
+    feature_check_url = _AKS_CLUSTER_URL.format(
+        armendpoint=armendpoint,
+        subscription_id=cluster_subscription,
+        resource_group_name=cluster_resource_group_name,
+        cluster_name=cluster_name
     )
     try:
         headers = ['User-Agent=azuremonitormetrics.check_azuremonitormetrics_profile']
-        r = send_raw_request(cmd.cli_ctx, "GET", feature_check_url,
-                             body={}, headers=headers)
+        r = send_raw_request(cmd.cli_ctx, "GET", feature_check_url, headers=headers)
     except CLIError as e:
         raise UnknownError(e)  # pylint: disable=raise-missing-from
-    json_response = json.loads(r.text)
-    values_array = json_response["properties"]
-    if "azureMonitorProfile" in values_array:
-        if "metrics" in values_array["azureMonitorProfile"]:
-            if values_array["azureMonitorProfile"]["metrics"]["enabled"] is True:
-                raise CLIError(
-                    "Azure Monitor Metrics is already enabled for this cluster. Please use "
-                    f"`az aks update --disable-azuremonitormetrics -g {cluster_resource_group_name} -n {cluster_name}` "
-                    "and then try enabling."
-                )
+    azure_monitor_profile = (_loads(r.content).get("properties") or {}).get("azureMonitorProfile") or {}
+    if (azure_monitor_profile.get("metrics") or {}).get("enabled") is True:
+        raise CLIError(
+            "Azure Monitor Metrics is already enabled for this cluster. Please use "
+            f"`az aks update --disable-azuremonitormetrics -g {cluster_resource_group_name} -n {cluster_name}` "
+            "and then try enabling."
+        )
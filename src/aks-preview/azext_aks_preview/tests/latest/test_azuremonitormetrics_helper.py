@@ -0,0 +1,132 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from azext_aks_preview.azuremonitormetrics.constants import (
+    AZURE_MONITOR_METRICS_RPS,
+    RP_API,
+    RP_REGISTRATION_CACHE_FILE,
+    RP_REGISTRATION_CACHE_TTL_SECONDS,
+)
+from azext_aks_preview.azuremonitormetrics.helper import (
+    cache_rp_registration,
+    is_rp_registration_cached,
+    rp_registrations,
+)
+
+
+def _mock_cmd():
+    cmd = Mock()
+    cmd.cli_ctx.cloud.endpoints.resource_manager = "https://management.azure.com"
+    return cmd
+
+
+def _mock_send_raw_request(unregistered_rp_names):
+    def send_raw_request(cli_ctx, method, url, headers=None):  # pylint: disable=unused-argument
+        response = Mock()
+        if method == "GET":
+            rp_name = url.split("/providers/")[1].split("?")[0]
+            state = "NotRegistered" if rp_name in unregistered_rp_names else "Registered"
+            response.content = json.dumps({"namespace": rp_name, "registrationState": state}).encode()
+        return response
+    return send_raw_request
+
+
+class RpRegistrationsTestCase(unittest.TestCase):
+    def _run_rp_registrations(self, unregistered_rp_names):
+        with patch(
+            "azext_aks_preview.azuremonitormetrics.helper.is_rp_registration_cached", return_value=False
+        ), patch(
+            "azext_aks_preview.azuremonitormetrics.helper.cache_rp_registration"
+        ) as mock_cache, patch(
+            "azure.cli.core.util.send_raw_request", side_effect=_mock_send_raw_request(unregistered_rp_names)
+        ) as mock_send:
+            rp_registrations(_mock_cmd(), "test_sub")
+        posted_urls = [c.args[2] for c in mock_send.call_args_list if c.args[1] == "POST"]
+        return posted_urls, mock_cache
+
+    def test_rp_registrations_all_registered(self):
+        posted_urls, mock_cache = self._run_rp_registrations([])
+        self.assertEqual(posted_urls, [])
+        mock_cache.assert_called_once_with("test_sub", AZURE_MONITOR_METRICS_RPS)
+
+    def test_rp_registrations_registers_only_missing_rps(self):
+        posted_urls, mock_cache = self._run_rp_registrations(["microsoft.monitor", "microsoft.dashboard"])
+        self.assertCountEqual(
+            posted_urls,
+            [
+                "https://management.azure.com/subscriptions/test_sub/providers/microsoft.monitor/register"
+                f"?api-version={RP_API}",
+                "https://management.azure.com/subscriptions/test_sub/providers/microsoft.dashboard/register"
+                f"?api-version={RP_API}",
+            ],
+        )
+        mock_cache.assert_not_called()
+
+
+class RpRegistrationCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.config_dir)
+        env_patcher = patch.dict(os.environ, {"AZURE_CONFIG_DIR": self.config_dir})
+        env_patcher.start()
+        self.addCleanup(env_patcher.stop)
+        self.cache_path = os.path.join(self.config_dir, RP_REGISTRATION_CACHE_FILE)
+
+    def _write_cache(self, content):
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_fresh_entry_skips_probes(self):
+        cache_rp_registration("test_sub", AZURE_MONITOR_METRICS_RPS)
+        self.assertTrue(is_rp_registration_cached("test_sub"))
+        self.assertFalse(is_rp_registration_cached("other_sub"))
+        with patch("azure.cli.core.util.send_raw_request") as mock_send:
+            rp_registrations(_mock_cmd(), "test_sub")
+        mock_send.assert_not_called()
+
+    def test_expired_entry(self):
+        self._write_cache(json.dumps({
+            "test_sub": {
+                "timestamp": time.time() - RP_REGISTRATION_CACHE_TTL_SECONDS - 1,
+                "registered_namespaces": sorted(AZURE_MONITOR_METRICS_RPS),
+            }
+        }))
+        self.assertFalse(is_rp_registration_cached("test_sub"))
+
+    def test_partial_entry(self):
+        self._write_cache(json.dumps({
+            "test_sub": {"timestamp": time.time(), "registered_namespaces": ["microsoft.insights"]}
+        }))
+        self.assertFalse(is_rp_registration_cached("test_sub"))
+
+    def test_corrupt_cache(self):
+        self._write_cache("not json")
+        self.assertFalse(is_rp_registration_cached("test_sub"))
+        for entry in [
+            None,
+            {"timestamp": "x", "registered_namespaces": sorted(AZURE_MONITOR_METRICS_RPS)},
+            {"timestamp": None, "registered_namespaces": sorted(AZURE_MONITOR_METRICS_RPS)},
+            {"timestamp": time.time(), "registered_namespaces": 5},
+            {"timestamp": time.time(), "registered_namespaces": [["microsoft.insights"]]},
+        ]:
+            self._write_cache(json.dumps({"test_sub": entry}))
+            self.assertFalse(is_rp_registration_cached("test_sub"))
+
+    def test_failed_write_removes_temp_file(self):
+        with patch("os.replace", side_effect=OSError("disk full")):
+            cache_rp_registration("test_sub", AZURE_MONITOR_METRICS_RPS)
+        self.assertEqual(os.listdir(self.config_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,7 @@
 # Code generated by Microsoft (R) AutoRest Code Generator.
 # Changes may cause incorrect behavior and will be lost if the code is regenerated.
 # --------------------------------------------------------------------------
+from types import MappingProxyType
 from typing import Any, Callable, Dict, Optional, TypeVar, Union
 
 from azure.core.exceptions import ClientAuthenticationError, HttpResponseError, ResourceExistsError, ResourceNotFoundError, map_error
@@ -23,6 +24,10 @@ from ...operations._hybrid_compute_management_client_operations import build_upg
 T = TypeVar('T')
 ClsType = Optional[Callable[[PipelineResponse[HttpRequest, AsyncHttpResponse], T, Dict[str, Any]], Any]]
 
+_DEFAULT_ERROR_MAP = MappingProxyType({
+    401: ClientAuthenticationError, 404: ResourceNotFoundError, 409: ResourceExistsError
+})
+
 class HybridComputeManagementClientOperationsMixin:
 
     async def _upgrade_extensions_initial(  # pylint: disable=inconsistent-return-statements
@@ -33,10 +38,10 @@ class HybridComputeManagementClientOperationsMixin:
         **kwargs: Any
     ) -> None:
         cls = kwargs.pop('cls', None)  # type: ClsType[None]
-        error_map = {
-            401: ClientAuthenticationError, 404: ResourceNotFoundError, 409: ResourceExistsError
-        }
-        error_map.update(kwargs.pop('error_map', {}))
+        error_map = _DEFAULT_ERROR_MAP
+        custom_error_map = kwargs.pop('error_map', None)
+        if custom_error_map:
+            error_map = {**_DEFAULT_ERROR_MAP, **custom_error_map}
 
         api_version = kwargs.pop('api_version', "2023-04-25-preview")  # type: str
         content_type = kwargs.pop('content_type', "application/json")  # type: Optional[str]
@@ -143,6 +148,9 @@ class HybridComputeManagementClientOperationsMixin:
                 client=self._client,
                 deserialization_callback=get_long_running_output
             )
+        if polling is True and raw_result.http_response.status_code == 200:
+            # The service completed the upgrade synchronously, there is nothing left to poll
+            polling_method = AsyncNoPolling()
         return AsyncLROPoller(self._client, raw_result, get_long_running_output, polling_method)
 
     begin_upgrade_extensions.metadata = {'url': "/subscriptions/{subscriptionId}/resourceGroups/{resourceGroupName}/providers/Microsoft.HybridCompute/machines/{machineName}/upgradeExtensions"}  # type: ignore
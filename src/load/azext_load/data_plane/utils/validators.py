@@ -5,7 +5,8 @@
 
 import os
 import re
-from collections import OrderedDict
+import stat
+from collections import defaultdict
 from datetime import datetime
 
 import yaml
@@ -16,8 +17,37 @@ from msrestazure.tools import is_valid_resource_id
 from . import utils
 from .models import AllowedFileTypes, AllowedIntervals, AllowedMetricNamespaces
 
+try:
+    from yaml import CSafeLoader as _YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlSafeLoader
+
 logger = get_logger(__name__)
 
+# Translation table deleting every character allowed in an id, anything left over is invalid
+_ID_STRIP_ALLOWED = str.maketrans("", "", "abcdefghijklmnopqrstuvwxyz0123456789_-")
+_AKV_URL_REGEX_TEMPLATE = (
+    r"^https://[a-zA-Z0-9_-]+\.(?:vault|vault-int)\.(?:azure|azure-int|usgovcloudapi|microsoftazure)"
+    r"\.(?:net|cn|de)/(?:{url_type})/[a-zA-Z0-9_-]+(?:/[a-zA-Z0-9_-]+|$)$"
+)
+_AKV_URL_RES = {
+    url_type: re.compile(_AKV_URL_REGEX_TEMPLATE.format(url_type=url_type), re.IGNORECASE)
+    for url_type in ("secrets", "certificates", "keys", "storage", "secrets|certificates|keys|storage")
+}
+
+_ALLOWED_FILE_TYPES = frozenset(utils.get_enum_values(AllowedFileTypes))
+_ALLOWED_FILE_TYPES_STR = ", ".join(utils.get_enum_values(AllowedFileTypes))
+_ALLOWED_INTERVALS = frozenset(utils.get_enum_values(AllowedIntervals))
+_ALLOWED_INTERVALS_STR = ", ".join(utils.get_enum_values(AllowedIntervals))
+_ALLOWED_METRIC_NAMESPACES = frozenset(utils.get_enum_values(AllowedMetricNamespaces))
+_ALLOWED_METRIC_NAMESPACES_STR = ", ".join(utils.get_enum_values(AllowedMetricNamespaces))
+
+# Canonical "%Y-%m-%dT%H:%M:%S[.%f]Z" timestamps, matched before falling back to strptime
+_ISO_TIME_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.\d{1,6})?Z")
+
+_SPLIT_CSV_TRUE = frozenset({"true", "yes", "y"})
+_SPLIT_CSV_VALID = frozenset({"true", "false", "yes", "no", "y", "n"})
+
 
 def validate_test_id(namespace):
     """Validates test-id"""
@@ -25,7 +55,7 @@ def validate_test_id(namespace):
         raise InvalidArgumentValueError(
             f"Invalid test-id type: {type(namespace.test_id)}"
         )
-    if not re.match("^[a-z0-9_-]*$", namespace.test_id):
+    if namespace.test_id.translate(_ID_STRIP_ALLOWED):
         raise InvalidArgumentValueError("Invalid test-id value")
 
 
@@ -37,15 +67,16 @@ def validate_test_run_id(namespace):
         raise InvalidArgumentValueError(
             f"Invalid test-run-id type: {type(namespace.test_run_id)}"
         )
-    if not re.match("^[a-z0-9_-]*$", namespace.test_run_id):
+    if namespace.test_run_id.translate(_ID_STRIP_ALLOWED):
         raise InvalidArgumentValueError("Invalid test-run-id value")
 
 
 def _validate_akv_url(string, url_type="secrets|certificates|keys|storage"):
     """Validates Azure Key Vault URL"""
-    # pylint: disable-next=line-too-long
-    regex = f"^https://[a-zA-Z0-9_-]+\\.(?:vault|vault-int)\\.(?:azure|azure-int|usgovcloudapi|microsoftazure)\\.(?:net|cn|de)/(?:{url_type})/[a-zA-Z0-9_-]+(?:/[a-zA-Z0-9_-]+|$)$"
-    return re.match(regex, string, re.IGNORECASE)
+    # Cheap scheme check first, most non-URL inputs never reach the regex engine
+    if string[:8].lower() != "https://":
+        return None
+    return _AKV_URL_RES[url_type].match(string)
 
 
 def validate_env_vars(namespace):
@@ -53,51 +84,36 @@ def validate_env_vars(namespace):
     if isinstance(namespace.env, list):
         env_vars_dict = {}
         for item in namespace.env:
-            env_vars_dict.update(_validate_env_var(item))
+            if not item:
+                continue
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise InvalidArgumentValueError(f"Invalid env argument: {item}")
+            env_vars_dict[key] = None if value in ("null", "") else value
         namespace.env = env_vars_dict
 
 
-def _validate_env_var(string):
-    """Extracts a single env var in key[=value] format"""
-    result = {}
-    if string:
-        comps = string.split("=", 1)
-        if len(comps) != 2:
-            raise InvalidArgumentValueError(f"Invalid env argument: {string}")
-        if comps[1] in ["null", ""]:
-            result = {comps[0]: None}
-        else:
-            result = {comps[0]: comps[1]}
-    return result
-
-
 def validate_secrets(namespace):
     """Extracts multiple space-separated secrets in key[=value] format"""
     if isinstance(namespace.secrets, list):
         secrets_dict = {}
         for item in namespace.secrets:
-            secrets_dict.update(_validate_secret(item))
+            if not item:
+                continue
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise InvalidArgumentValueError(f"Invalid secret argument: {item}")
+            if value in ("null", ""):
+                secrets_dict[key] = None
+            elif not _validate_akv_url(value, "secrets"):
+                raise InvalidArgumentValueError(
+                    f"Invalid Azure Key Vault Secret URL: {value}"
+                )
+            else:
+                secrets_dict[key] = {"type": "AKV_SECRET_URI", "value": value}
         namespace.secrets = secrets_dict
 
 
-def _validate_secret(string):
-    """Extracts a single secret in key[=value] format"""
-    result = {}
-    if string:
-        comps = string.split("=", 1)
-        if len(comps) != 2:
-            raise InvalidArgumentValueError(f"Invalid secret argument: {string}")
-        if comps[1] in ["null", ""]:
-            result = {comps[0]: None}
-        elif not _validate_akv_url(comps[1], "secrets"):
-            raise InvalidArgumentValueError(
-                f"Invalid Azure Key Vault Secret URL: {comps[1]}"
-            )
-        else:
-            result = {comps[0]: {"type": "AKV_SECRET_URI", "value": comps[1]}}
-    return result
-
-
 def validate_certificate(namespace):
     """Extracts single certificate in key[=value] format"""
     if namespace.certificate is None:
@@ -112,20 +128,20 @@ def validate_certificate(namespace):
         raise InvalidArgumentValueError(
             f"Invalid certificate value type: {type(namespace.certificate)}"
         )
-    comps = certificate.split("=", 1)
-    if len(comps) != 2:
+    name, sep, value = certificate.partition("=")
+    if not sep:
         raise InvalidArgumentValueError(f"Invalid certificate argument: {certificate}")
-    if (comps[1] not in ["", "null"]) and not _validate_akv_url(comps[1], "certificates"):
+    if value in ("null", ""):
+        namespace.certificate = "null"
+    elif not _validate_akv_url(value, "certificates"):
         raise InvalidArgumentValueError(
-            f"Invalid Azure Key Vault Certificate URL: {comps[1]}"
+            f"Invalid Azure Key Vault Certificate URL: {value}"
         )
-    if comps[1] in ["null", ""]:
-        namespace.certificate = "null"
     else:
         namespace.certificate = {
-            "name": comps[0],
+            "name": name,
             "type": "AKV_CERT_URI",
-            "value": comps[1],
+            "value": value,
         }
 
 
@@ -141,19 +157,24 @@ def validate_subnet_id(namespace):
         )
 
 
-def validate_app_component_id(namespace):
-    if not isinstance(namespace.app_component_id, str):
-        raise InvalidArgumentValueError(
-            f"Invalid app-component-id type: {type(namespace.app_component_id)}"
-        )
-    if not is_valid_resource_id(namespace.app_component_id):
+def _validate_resource_id(value, arg_name):
+    """Validates that the argument is an Azure Resource ID"""
+    if not isinstance(value, str):
+        raise InvalidArgumentValueError(f"Invalid {arg_name} type: {type(value)}")
+    # Resource IDs must start with /subscriptions/, check that before the heavier full parse
+    if value[:15].lower() != "/subscriptions/" or not is_valid_resource_id(value):
         raise InvalidArgumentValueError(
-            f"app-component-id is not a valid Azure Resource ID: {namespace.app_component_id}"
+            f"{arg_name} is not a valid Azure Resource ID: {value}"
         )
 
 
+def validate_app_component_id(namespace):
+    _validate_resource_id(namespace.app_component_id, "app-component-id")
+
+
 def validate_app_component_type(namespace):
-    provider_name = "/".join(namespace.app_component_id.split("/")[6:8]).casefold()
+    # Only the provider namespace and type segments are needed, stop splitting after them
+    provider_name = "/".join(namespace.app_component_id.split("/", 8)[6:8]).casefold()
     if provider_name != namespace.app_component_type.casefold():
         raise InvalidArgumentValueError(
             "Type of app-component-id and app-component-type mismatch: "
@@ -162,14 +183,7 @@ def validate_app_component_type(namespace):
 
 
 def validate_metric_id(namespace):
-    if not isinstance(namespace.metric_id, str):
-        raise InvalidArgumentValueError(
-            f"Invalid metric-id type: {type(namespace.metric_id)}"
-        )
-    if not is_valid_resource_id(namespace.metric_id):
-        raise InvalidArgumentValueError(
-            f"metric-id is not a valid Azure Resource ID: {namespace.metric_id}"
-        )
+    _validate_resource_id(namespace.metric_id, "metric-id")
     if "metric" not in namespace.metric_id.casefold():
         raise InvalidArgumentValueError(
             f"Provided Azure Resource ID is not a valid server metrics resource: {namespace.metric_id}"
@@ -206,7 +220,9 @@ def validate_load_test_config_file(namespace):
     )
     try:
         with open(namespace.load_test_config_file, "r", encoding="UTF-8") as file:
-            yaml.safe_load(file)
+            # Only well-formedness is checked here, so run the event stream without constructing objects
+            for _ in yaml.parse(file, Loader=_YamlSafeLoader):
+                pass
     except Exception as e:
         raise FileOperationError(
             f"Failed to read YAML file: {namespace.load_test_config_file}. Error: {e}"
@@ -239,10 +255,13 @@ def _validate_path(path, is_dir=False):
 
     path = os.path.normpath(os.path.expanduser(path))
 
-    if not os.path.exists(path):
-        raise InvalidArgumentValueError(f"Provided path '{path}' does not exist")
+    # A single stat() answers both existence and type, access is still checked with os.access
+    try:
+        path_stat = os.stat(path)
+    except (OSError, ValueError) as e:
+        raise InvalidArgumentValueError(f"Provided path '{path}' does not exist") from e
     if is_dir:
-        if not os.path.isdir(path):
+        if not stat.S_ISDIR(path_stat.st_mode):
             raise InvalidArgumentValueError(
                 f"Provided path '{path}' is not a directory"
             )
@@ -251,7 +270,7 @@ def _validate_path(path, is_dir=False):
                 f"Provided path '{path}' is not writable or executable"
             )
     else:
-        if not os.path.isfile(path):
+        if not stat.S_ISREG(path_stat.st_mode):
             raise InvalidArgumentValueError(f"Provided path '{path}' is not a file")
         if not os.access(path, os.R_OK):
             raise FileOperationError(f"Provided path '{path}' is not readable")
@@ -265,10 +284,9 @@ def validate_file_type(namespace):
         raise InvalidArgumentValueError(
             f"Invalid file-type type: {type(namespace.file_type)}"
         )
-    allowed_file_types = utils.get_enum_values(AllowedFileTypes)
-    if namespace.file_type not in allowed_file_types:
+    if namespace.file_type not in _ALLOWED_FILE_TYPES:
         raise InvalidArgumentValueError(
-            f"Invalid file-type value: {namespace.file_type}. Allowed values: {', '.join(allowed_file_types)}"
+            f"Invalid file-type value: {namespace.file_type}. Allowed values: {_ALLOWED_FILE_TYPES_STR}"
         )
 
 
@@ -285,6 +303,13 @@ def _validate_iso_time(string):
         return
     if not isinstance(string, str):
         raise InvalidArgumentValueError(f"Invalid time type: {type(string)}")
+    match = _ISO_TIME_RE.fullmatch(string)
+    if match:
+        try:
+            datetime(*map(int, match.groups()))
+            return
+        except ValueError:
+            pass
     try:
         datetime.strptime(string, "%Y-%m-%dT%H:%M:%S.%fZ")
         return
@@ -307,10 +332,9 @@ def validate_interval(namespace):
         raise InvalidArgumentValueError(
             f"Invalid interval type: {type(namespace.interval)}"
         )
-    allowed_intervals = utils.get_enum_values(AllowedIntervals)
-    if namespace.interval not in allowed_intervals:
+    if namespace.interval not in _ALLOWED_INTERVALS:
         raise InvalidArgumentValueError(
-            f"Invalid interval value: {namespace.interval}. Allowed values: {', '.join(allowed_intervals)}"
+            f"Invalid interval value: {namespace.interval}. Allowed values: {_ALLOWED_INTERVALS_STR}"
         )
 
 
@@ -319,38 +343,25 @@ def validate_metric_namespaces(namespace):
         raise InvalidArgumentValueError(
             f"Invalid metric-namespace type: {type(namespace.metric_namespace)}"
         )
-    allowed_metric_namespaces = utils.get_enum_values(AllowedMetricNamespaces)
-    if namespace.metric_namespace not in allowed_metric_namespaces:
+    if namespace.metric_namespace not in _ALLOWED_METRIC_NAMESPACES:
         raise InvalidArgumentValueError(
             f"Invalid metric-namespace value: {namespace.metric_namespace}. "
-            f"Allowed values: {', '.join(allowed_metric_namespaces)}"
+            f"Allowed values: {_ALLOWED_METRIC_NAMESPACES_STR}"
         )
 
 
 def validate_dimension_filters(namespace):
     """Extracts multiple space separated dimension filters in key1[=value1] key1[=value2] key2[=value3] format"""
     if isinstance(namespace.dimension_filters, list):
-        filters_dict = OrderedDict()
+        filters_dict = defaultdict(list)
         for item in namespace.dimension_filters:
-            dimension_filter = _validate_dimension_filter(item)
-            for key, value in dimension_filter.items():
-                if key in filters_dict:
-                    filters_dict[key].append(value)
-                else:
-                    filters_dict[key] = [value]
-        filters_list = []
-        for key, value in filters_dict.items():
-            filters_list.append({"name": key, "values": value})
-        namespace.dimension_filters = filters_list
-
-
-def _validate_dimension_filter(string):
-    """Extracts a single dimension filters in key1[=value1] format"""
-    result = {}
-    if string:
-        comps = string.split("=", 1)
-        result = {comps[0]: comps[1]} if len(comps) > 1 else {string: ""}
-    return result
+            if not item:
+                continue
+            key, _, value = item.partition("=")
+            filters_dict[key].append(value)
+        namespace.dimension_filters = [
+            {"name": key, "values": values} for key, values in filters_dict.items()
+        ]
 
 
 def validate_split_csv(namespace):
@@ -360,18 +371,9 @@ def validate_split_csv(namespace):
         raise InvalidArgumentValueError(
             f"Invalid split-csv type: {type(namespace.split_csv)}"
         )
-    if namespace.split_csv.casefold() not in [
-        "true",
-        "false",
-        "yes",
-        "no",
-        "y",
-        "n",
-    ]:
+    split_csv = namespace.split_csv.casefold()
+    if split_csv not in _SPLIT_CSV_VALID:
         raise InvalidArgumentValueError(
             f"Invalid split-csv value: {namespace.split_csv}. Allowed values: true, false, yes, no, y, n"
         )
-    if namespace.split_csv.casefold() in ["true", "yes", "y"]:
-        namespace.split_csv = True
-    else:
-        namespace.split_csv = False
+    namespace.split_csv = split_csv in _SPLIT_CSV_TRUE